@@ -1,19 +1,48 @@
 import os
-import json
+import orjson
 import requests
-from flask import Flask, request, render_template, jsonify
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, Response, request, render_template, jsonify
+from flask.json.provider import JSONProvider
 from dotenv import load_dotenv
+import collections
 import datetime
 import logging
-
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
-logger = logging.getLogger(__name__)
+import queue
+import sqlite3
+import threading
+import time
+import uuid
 
 # Load environment variables
 load_dotenv()
 
+# Set up logging; INFO by default so the DEBUG-level per-event lines
+# (and their formatting cost) only run when LOG_LEVEL=DEBUG is set
+logging.basicConfig(level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO))
+logger = logging.getLogger(__name__)
+
+class ORJSONProvider(JSONProvider):
+    """Encodes jsonify responses with orjson instead of pure-Python json."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+# Werkzeug rejects oversized bodies with 413 before they are read into memory
+app.config['MAX_CONTENT_LENGTH'] = 1 * 1024 * 1024
+
+@app.before_request
+def require_json_for_posts():
+    """Rejects non-JSON POST bodies before any handler parses them."""
+    if request.method == 'POST' and not request.is_json:
+        return jsonify({'status': 'error', 'message': 'Content-Type must be application/json.'}), 415
 
 # Configuration from environment variables
 WHATSAPP_API_VERSION = os.getenv('WHATSAPP_API_VERSION', 'v19.0')
@@ -21,8 +50,217 @@ WHATSAPP_PHONE_NUMBER_ID = os.getenv('WHATSAPP_PHONE_NUMBER_ID')
 WHATSAPP_ACCESS_TOKEN = os.getenv('WHATSAPP_ACCESS_TOKEN')
 WHATSAPP_VERIFY_TOKEN = os.getenv('WHATSAPP_VERIFY_TOKEN')
 
-# Basic in-memory store for messages (NOT FOR PRODUCTION - use a database)
-MESSAGES_STORE = []
+# The version, phone-number id and token are constant for the process
+# lifetime, so build the Graph API URL and headers once at import
+WHATSAPP_API_URL = f"https://graph.facebook.com/{WHATSAPP_API_VERSION}/{WHATSAPP_PHONE_NUMBER_ID}/messages"
+
+# Shared HTTP session so consecutive sends reuse the same TLS connection
+# instead of paying the handshake cost on every message
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=100,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504])
+))
+
+HEADERS = {
+    "Authorization": f"Bearer {WHATSAPP_ACCESS_TOKEN}",
+    "Content-Type": "application/json",
+}
+
+# Messages live in SQLite so all gunicorn workers see the same state;
+# WAL mode allows concurrent readers alongside the single writer
+MESSAGES_DB = os.getenv('MESSAGES_DB', 'messages.db')
+
+# Best-effort retention: drop the oldest rows once the store exceeds the
+# cap, so memory/disk stays bounded on small dynos
+MESSAGE_STORE_CAP = int(os.getenv('MESSAGE_STORE_CAP', '10000'))
+
+_db_local = threading.local()
+
+def get_db():
+    """Returns this thread's SQLite connection, creating it on first use."""
+    conn = getattr(_db_local, 'conn', None)
+    if conn is None:
+        conn = sqlite3.connect(MESSAGES_DB)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Writers from other threads/workers block briefly instead of
+        # failing with 'database is locked' under concurrent load
+        conn.execute("PRAGMA busy_timeout=5000")
+        _db_local.conn = conn
+    return conn
+
+def init_db():
+    conn = get_db()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id TEXT PRIMARY KEY,
+            sender TEXT,
+            recipient TEXT,
+            text TEXT,
+            direction TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            type TEXT,
+            status TEXT,
+            timestamp_status_update TEXT
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_timestamp_id ON messages(timestamp, id)")
+    conn.commit()
+
+def store_message(message_obj):
+    conn = get_db()
+    conn.execute(
+        """INSERT OR REPLACE INTO messages (id, sender, recipient, text, direction, timestamp, type, status)
+           VALUES (:id, :sender, :recipient, :text, :direction, :timestamp, :type, :status)""",
+        {'recipient': None, 'type': None, 'status': None, **message_obj}
+    )
+    conn.execute(
+        "DELETE FROM messages WHERE id IN ("
+        "  SELECT id FROM messages ORDER BY timestamp"
+        "  LIMIT MAX((SELECT COUNT(*) FROM messages) - ?, 0)"
+        ")",
+        (MESSAGE_STORE_CAP,)
+    )
+    conn.commit()
+
+def update_message_status(message_id, status, timestamp_status_update=None):
+    """Applies a status update; returns the number of rows it matched."""
+    conn = get_db()
+    cursor = conn.execute(
+        "UPDATE messages SET status = ?, timestamp_status_update = COALESCE(?, timestamp_status_update) "
+        "WHERE id = ? AND direction = 'out'",
+        (status, timestamp_status_update, message_id)
+    )
+    conn.commit()
+    return cursor.rowcount
+
+def confirm_message_sent(local_id, message_id_wa):
+    """Swaps the local UUID for the WhatsApp id once the Graph API accepts the send."""
+    conn = get_db()
+    conn.execute("UPDATE messages SET id = ?, status = 'sent' WHERE id = ?", (message_id_wa, local_id))
+    conn.commit()
+
+def fetch_messages(since=None, limit=None):
+    """Returns messages after the `since` cursor in (timestamp, id) order.
+
+    Timestamps alone are not unique - broadcasts and webhook batches stamp
+    whole groups of rows with one timestamp - so the cursor is
+    'timestamp|id' and the id breaks ties. A bare timestamp cursor is
+    still accepted.
+    """
+    conn = get_db()
+    query = "SELECT * FROM messages"
+    params = []
+    if since:
+        since_ts, _, since_id = since.partition('|')
+        if since_id:
+            query += " WHERE (timestamp, id) > (?, ?)"
+            params.extend([since_ts, since_id])
+        else:
+            query += " WHERE timestamp > ?"
+            params.append(since_ts)
+    query += " ORDER BY timestamp, id"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return [row_to_dict(row) for row in conn.execute(query, params)]
+
+def count_messages():
+    return get_db().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+def row_to_dict(row):
+    return {key: row[key] for key in row.keys() if row[key] is not None}
+
+init_db()
+
+# Message type -> text extractor; dict dispatch resolves the type in one
+# hash lookup and keeps all per-type extraction logic in one table
+TYPE_EXTRACTORS = {
+    'text': lambda m: (m.get('text') or {}).get('body'),
+    'image': lambda m: f"[Image] {(m.get('image') or {}).get('caption', 'No caption')}",
+    'document': lambda m: f"[Document] {(m.get('document') or {}).get('filename', 'Unknown file')}",
+    'audio': lambda m: "[Audio message]",
+    'video': lambda m: f"[Video] {(m.get('video') or {}).get('caption', 'No caption')}",
+}
+
+# Outbound sends are queued and performed by background threads so the
+# request thread never blocks on the Graph API round trip; several workers
+# drain the queue in parallel so broadcasts complete in ~one round trip
+# instead of one per recipient (SESSION's pool covers their connections)
+SEND_QUEUE = queue.Queue()
+MAX_SEND_RETRIES = 5
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', '4'))
+
+# Webhook payloads are queued and processed off the request thread so the
+# 200 ack reaches Meta before its retry window, even if store writes are slow;
+# the bound provides backpressure instead of unbounded memory growth
+WEBHOOK_QUEUE = queue.Queue(maxsize=int(os.getenv('WEBHOOK_QUEUE_CAP', '10000')))
+
+# Meta retries webhook deliveries, so the same event can arrive more than
+# once; remember recently-seen keys (LRU-bounded) and skip duplicates
+SEEN_EVENTS = collections.OrderedDict()
+SEEN_EVENTS_CAP = 50000
+
+def seen_event(key):
+    """Returns True if this event key was already processed."""
+    return key in SEEN_EVENTS
+
+def record_event(key):
+    """Marks an event key as processed, evicting the oldest beyond the cap."""
+    SEEN_EVENTS[key] = None
+    if len(SEEN_EVENTS) > SEEN_EVENTS_CAP:
+        SEEN_EVENTS.popitem(last=False)
+
+def dispatch_whatsapp(recipient_wa_id, message_text, local_id):
+    """Performs the actual Graph API POST for a queued message, with retries."""
+    payload = {
+        "messaging_product": "whatsapp",
+        "to": recipient_wa_id,
+        "type": "text",
+        "text": {"body": message_text}
+    }
+
+    for attempt in range(MAX_SEND_RETRIES):
+        try:
+            # orjson is C-backed and much faster than json; HEADERS already
+            # carries the Content-Type, so pass the serialized bytes directly
+            response = SESSION.post(WHATSAPP_API_URL, headers=HEADERS, data=orjson.dumps(payload), timeout=(3, 10))
+            response.raise_for_status()
+            response_data = response.json()
+            message_id_wa = (response_data.get("messages") or [{}])[0].get("id")
+
+            if not message_id_wa:
+                # Never rewrite the primary key to NULL; keep the local UUID
+                # so the row stays addressable, and flag the send as failed
+                logger.error(f"Graph API response for {local_id} carried no message id: {response_data}")
+                update_message_status(local_id, 'failed')
+                return
+
+            confirm_message_sent(local_id, message_id_wa)
+            logger.debug("Message %s sent successfully as %s", local_id, message_id_wa)
+            return
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error sending WhatsApp message (attempt {attempt + 1}): {e}")
+            time.sleep(2 ** attempt)
+
+    update_message_status(local_id, 'failed')
+    logger.error(f"Giving up on message {local_id} after {MAX_SEND_RETRIES} attempts")
+
+def _send_worker():
+    """Drains SEND_QUEUE forever; runs in a daemon thread."""
+    while True:
+        recipient_wa_id, message_text, local_id = SEND_QUEUE.get()
+        try:
+            dispatch_whatsapp(recipient_wa_id, message_text, local_id)
+        except Exception as e:
+            logger.error(f"Unexpected error in send worker: {e}")
+        finally:
+            SEND_QUEUE.task_done()
+
+for _ in range(SEND_WORKERS):
+    threading.Thread(target=_send_worker, daemon=True).start()
 
 @app.route('/')
 def index():
@@ -62,150 +300,229 @@ def webhook():
 
     elif request.method == 'POST':
         try:
-            data = request.get_json()
-            logger.info(f"Received webhook data: {json.dumps(data, indent=2)}")
-
-            if data.get('object') == 'whatsapp_business_account':
-                for entry in data.get('entry', []):
-                    for change in entry.get('changes', []):
-                        if change.get('field') == 'messages':
-                            value = change.get('value', {})
-                            
-                            # Handle incoming messages
-                            if 'messages' in value:
-                                for message_data in value.get('messages', []):
-                                    logger.info(f"Processing message: {message_data}")
-                                    
-                                    message_type = message_data.get('type')
-                                    sender_id = message_data.get('from')
-                                    message_id = message_data.get('id')
-                                    timestamp = datetime.datetime.now().isoformat()
-                                    
-                                    text_body = None
-                                    
-                                    # Handle different message types
-                                    if message_type == 'text':
-                                        text_body = message_data.get('text', {}).get('body')
-                                    elif message_type == 'image':
-                                        text_body = f"[Image] {message_data.get('image', {}).get('caption', 'No caption')}"
-                                    elif message_type == 'document':
-                                        text_body = f"[Document] {message_data.get('document', {}).get('filename', 'Unknown file')}"
-                                    elif message_type == 'audio':
-                                        text_body = "[Audio message]"
-                                    elif message_type == 'video':
-                                        text_body = f"[Video] {message_data.get('video', {}).get('caption', 'No caption')}"
-                                    else:
-                                        text_body = f"[{message_type.upper()} message]"
-                                    
-                                    if sender_id and text_body:
-                                        message_obj = {
-                                            'id': message_id,
-                                            'sender': sender_id,
-                                            'text': text_body,
-                                            'direction': 'in',
-                                            'timestamp': timestamp,
-                                            'type': message_type
-                                        }
-                                        MESSAGES_STORE.append(message_obj)
-                                        logger.info(f"Stored incoming message: {message_obj}")
-                            
-                            # Handle message status updates
-                            elif 'statuses' in value:
-                                for status_data in value.get('statuses', []):
-                                    message_id = status_data.get('id')
-                                    status = status_data.get('status')
-                                    recipient_id = status_data.get('recipient_id')
-                                    timestamp_s = status_data.get('timestamp')
-                                    
-                                    logger.info(f"Status update: message_id={message_id}, status={status}, recipient={recipient_id}")
-                                    
-                                    # Update message status in store
-                                    for msg in MESSAGES_STORE:
-                                        if msg.get('id') == message_id and msg['direction'] == 'out':
-                                            msg['status'] = status
-                                            if timestamp_s:
-                                                msg['timestamp_status_update'] = datetime.datetime.fromtimestamp(int(timestamp_s)).isoformat()
-                                            break
-            
+            # silent=True turns malformed JSON into None instead of an
+            # exception; cache=False skips stashing the parsed body on the
+            # request object we are about to discard
+            data = request.get_json(silent=True, cache=False)
+            if not data:
+                return "Bad Request", 400
+
+            # Lazy %s formatting defers the repr to the logging framework,
+            # so nothing is serialized unless DEBUG is actually emitted
+            logger.debug("Received webhook data: %s", data)
+
+            # Ack Meta immediately; parsing and store writes happen on the
+            # drain thread so slow I/O never delays the 200 past the retry window
+            WEBHOOK_QUEUE.put_nowait(data)
             return "EVENT_RECEIVED", 200
-            
+
+        except queue.Full:
+            logger.error("Webhook queue full, rejecting event")
+            return "BACKPRESSURE", 503
         except Exception as e:
             logger.error(f"Error processing webhook: {e}")
             return "ERROR", 500
-    
+
     else:
         return "Method Not Allowed", 405
 
+def process_webhook_event(data):
+    """Parses one queued webhook payload and applies its store updates."""
+    # All messages in a webhook batch share one arrival timestamp,
+    # so compute it once per payload instead of per message
+    received_at = datetime.datetime.now().isoformat()
+
+    if data.get('object') == 'whatsapp_business_account':
+        for entry in data.get('entry', []):
+            for change in entry.get('changes', []):
+                if change.get('field') == 'messages':
+                    value = change.get('value', {})
+                    
+                    # Handle incoming messages
+                    if 'messages' in value:
+                        for message_data in value.get('messages', []):
+                            logger.debug("Processing message: %s", message_data)
+                            
+                            message_type = message_data.get('type')
+                            sender_id = message_data.get('from')
+                            message_id = message_data.get('id')
+                            timestamp = received_at
+
+                            if seen_event(message_id):
+                                logger.debug("Skipping duplicate message: %s", message_id)
+                                continue
+
+                            extractor = TYPE_EXTRACTORS.get(message_type)
+                            text_body = extractor(message_data) if extractor else f"[{message_type.upper()} message]"
+
+                            if sender_id and text_body:
+                                message_obj = {
+                                    'id': message_id,
+                                    'sender': sender_id,
+                                    'text': text_body,
+                                    'direction': 'in',
+                                    'timestamp': timestamp,
+                                    'type': message_type
+                                }
+                                store_message(message_obj)
+                                # Record only after storing, so an event we
+                                # declined is not deduplicated away on retry
+                                record_event(message_id)
+                                logger.debug("Stored incoming message: %s", message_obj)
+                    
+                    # Handle message status updates
+                    elif 'statuses' in value:
+                        for status_data in value.get('statuses', []):
+                            message_id = status_data.get('id')
+                            status = status_data.get('status')
+                            recipient_id = status_data.get('recipient_id')
+                            timestamp_s = status_data.get('timestamp')
+                            
+                            logger.debug("Status update: message_id=%s, status=%s, recipient=%s", message_id, status, recipient_id)
+
+                            if seen_event((message_id, status)):
+                                logger.debug("Skipping duplicate status: %s %s", message_id, status)
+                                continue
+
+                            # Update message status in store; the id is the
+                            # primary key, so this is an index lookup. Record
+                            # the key only if a row matched - the outgoing row
+                            # may not carry its WhatsApp id yet while the send
+                            # worker is still confirming, and Meta's retry
+                            # must then be allowed through
+                            timestamp_status = datetime.datetime.fromtimestamp(int(timestamp_s)).isoformat() if timestamp_s else None
+                            if update_message_status(message_id, status, timestamp_status):
+                                record_event((message_id, status))
+
+def _webhook_worker():
+    """Drains WEBHOOK_QUEUE forever; runs in a daemon thread."""
+    while True:
+        data = WEBHOOK_QUEUE.get()
+        try:
+            process_webhook_event(data)
+        except Exception as e:
+            logger.error(f"Error processing webhook event: {e}")
+        finally:
+            WEBHOOK_QUEUE.task_done()
+
+threading.Thread(target=_webhook_worker, daemon=True).start()
+
 @app.route('/send_message', methods=['POST'])
 def send_message_route():
     """Endpoint to send a message from the custom UI."""
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True, cache=False) or {}
         recipient_wa_id = data.get('recipient_wa_id')
         message_text = data.get('message_text')
 
         if not recipient_wa_id or not message_text:
             return jsonify({'status': 'error', 'message': 'Recipient ID and message text are required.'}), 400
 
-        whatsapp_api_url = f"https://graph.facebook.com/{WHATSAPP_API_VERSION}/{WHATSAPP_PHONE_NUMBER_ID}/messages"
-        headers = {
-            "Authorization": f"Bearer {WHATSAPP_ACCESS_TOKEN}",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "messaging_product": "whatsapp",
-            "to": recipient_wa_id,
-            "type": "text",
-            "text": {"body": message_text}
-        }
+        logger.debug("Queueing message to %s: %s", recipient_wa_id, message_text)
 
-        logger.info(f"Sending message to {recipient_wa_id}: {message_text}")
-        
-        response = requests.post(whatsapp_api_url, headers=headers, data=json.dumps(payload))
-        response.raise_for_status()
-        response_data = response.json()
-        message_id_wa = response_data.get("messages", [{}])[0].get("id")
-
-        # Store outgoing message
+        # Store outgoing message immediately; the worker fills in the WA id
+        local_id = str(uuid.uuid4())
         message_obj = {
-            'id': message_id_wa,
+            'id': local_id,
             'sender': WHATSAPP_PHONE_NUMBER_ID,
             'recipient': recipient_wa_id,
             'text': message_text,
             'direction': 'out',
             'timestamp': datetime.datetime.now().isoformat(),
-            'status': 'sent'
+            'status': 'queued'
         }
-        MESSAGES_STORE.append(message_obj)
-        
-        logger.info(f"Message sent successfully: {message_obj}")
-        return jsonify({'status': 'success', 'data': response_data, 'message_id': message_id_wa})
-        
-    except requests.exceptions.RequestException as e:
-        error_message = f"Error sending WhatsApp message: {e}"
-        logger.error(error_message)
-        return jsonify({'status': 'error', 'message': error_message}), 500
+        store_message(message_obj)
+        SEND_QUEUE.put((recipient_wa_id, message_text, local_id))
+
+        return jsonify({'status': 'queued', 'local_id': local_id}), 202
+
+    except Exception as e:
+        logger.error(f"Unexpected error: {e}")
+        return jsonify({'status': 'error', 'message': 'An unexpected error occurred.'}), 500
+
+@app.route('/send_broadcast', methods=['POST'])
+def send_broadcast_route():
+    """Endpoint to send the same message to multiple recipients in parallel."""
+    try:
+        data = request.get_json(silent=True, cache=False) or {}
+        recipients = data.get('recipients')
+        message_text = data.get('message_text')
+
+        # A JSON string would iterate per character below, so require an
+        # actual list of WhatsApp ids
+        if not isinstance(recipients, list) or not recipients or not message_text:
+            return jsonify({'status': 'error', 'message': 'Recipients list and message text are required.'}), 400
+        if not all(isinstance(r, str) and r for r in recipients):
+            return jsonify({'status': 'error', 'message': 'Recipients must be non-empty strings.'}), 400
+
+        logger.debug("Queueing broadcast to %d recipients", len(recipients))
+
+        local_ids = []
+        timestamp = datetime.datetime.now().isoformat()
+        for recipient_wa_id in recipients:
+            local_id = str(uuid.uuid4())
+            store_message({
+                'id': local_id,
+                'sender': WHATSAPP_PHONE_NUMBER_ID,
+                'recipient': recipient_wa_id,
+                'text': message_text,
+                'direction': 'out',
+                'timestamp': timestamp,
+                'status': 'queued'
+            })
+            SEND_QUEUE.put((recipient_wa_id, message_text, local_id))
+            local_ids.append(local_id)
+
+        return jsonify({'status': 'queued', 'local_ids': local_ids}), 202
+
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         return jsonify({'status': 'error', 'message': 'An unexpected error occurred.'}), 500
 
 @app.route('/get_messages', methods=['GET'])
 def get_messages_route():
-    """Endpoint to fetch all messages for the UI."""
-    logger.info(f"Fetching {len(MESSAGES_STORE)} messages")
+    """Endpoint to fetch messages for the UI, newest after an optional cursor.
+
+    Query params:
+        since: cursor from a previous response's next_cursor (a bare ISO
+            timestamp also works); only newer messages are returned.
+        limit: maximum number of messages per page; omit for no cap.
+    """
+    since = request.args.get('since')
+    try:
+        limit = int(request.args.get('limit')) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'limit must be an integer.'}), 400
+    # A negative LIMIT means "no limit" to SQLite - the opposite of a cap
+    if limit is not None and limit < 0:
+        return jsonify({'status': 'error', 'message': 'limit must not be negative.'}), 400
+
+    # The chat UI polls with no params and repopulates from the full
+    # response, so only page when the caller asked for a page
+    page = fetch_messages(since=since, limit=limit)
+
+    logger.debug("Fetching %d messages (since=%s)", len(page), since)
     return jsonify({
-        'messages': sorted(MESSAGES_STORE, key=lambda x: x['timestamp']),
-        'count': len(MESSAGES_STORE)
+        'messages': page,
+        'count': len(page),
+        'next_cursor': f"{page[-1]['timestamp']}|{page[-1]['id']}" if page else since
     })
 
 @app.route('/debug/messages')
 def debug_messages():
-    """Debug endpoint to see all stored messages."""
-    return jsonify({
-        'total_messages': len(MESSAGES_STORE),
-        'messages': MESSAGES_STORE,
-        'timestamp': datetime.datetime.now().isoformat()
-    })
+    """Debug endpoint to see all stored messages, streamed row by row."""
+    total = count_messages()
+    timestamp = datetime.datetime.now().isoformat()
+
+    def generate():
+        # Encode one row per chunk so the full dump is never held in
+        # memory at once, however large the store grows
+        yield '{"total_messages":%d,"timestamp":"%s","messages":[' % (total, timestamp)
+        for i, row in enumerate(get_db().execute("SELECT * FROM messages ORDER BY timestamp")):
+            yield (',' if i else '') + orjson.dumps(row_to_dict(row)).decode()
+        yield ']}'
+
+    return Response(generate(), mimetype='application/json')
 
 if __name__ == '__main__':
     # Check configuration
@@ -222,10 +539,13 @@ if __name__ == '__main__':
     else:
         logger.info("All WhatsApp credentials loaded successfully")
     
-    port = int(os.environ.get("PORT", 5000))
-    logger.info(f"Starting server on port {port}")
     logger.info(f"Health check: https://kmartwhatsapp.onrender.com/health")
     logger.info(f"UI: https://kmartwhatsapp.onrender.com/")
     logger.info(f"Debug messages: https://kmartwhatsapp.onrender.com/debug/messages")
-    
+
+    # The Werkzeug dev server is single-threaded and has no keep-alive;
+    # production runs under gunicorn (see Procfile). Keep app.run for local
+    # development only.
+    port = int(os.environ.get("PORT", 5000))
+    logger.info(f"Starting dev server on port {port} - use 'gunicorn app:app' in production")
     app.run(debug=os.getenv('FLASK_DEBUG', 'False').lower() == 'true', host='0.0.0.0', port=port)
\ No newline at end of file